@@ -1,41 +1,43 @@
 # pyright: basic
 
 import asyncio
+import socket
 import struct
 import threading
 import tkinter as tk
 
-from bleak import BleakClient, BleakScanner
-from pythonosc import udp_client
+from bleak import BleakClient
+
+from opennx.nx import (
+    START_UUID,
+    STREAM_UUID,
+    find_nx_tracker,
+    request_low_latency,
+    unpack_packet,
+)
 
-DEVICE_NAME = "Nx Tracker 2"
-START_UUID = "0000a011-5761-7665-7341-7564696f4c74"
-STREAM_UUID = "0000a015-5761-7665-7341-7564696f4c74"
 BATTERY_UUID = "00002a19-0000-1000-8000-00805f9b34fb"
-RESET = "0000a011-5761-7665-7341-7564696f4c74"
+RESET = START_UUID
 
 # OSC target (any OSC server listening here will get the /quat messages)
 OSC_IP = "127.0.0.1"
 OSC_PORT = 9000
 
+# "/quat" address and ",ffff" type tags, each null-padded to 4 bytes. they never change,
+# so OSC messages are built once and only the four big-endian float32 args are rewritten
+_OSC_HEADER = b"/quat\x00\x00\x00,ffff\x00\x00\x00"
+_OSC_ARGS = struct.Struct(">4f")
 
-def parse_packet(data: bytes):
-    q0, q1, q2, q3, _ = struct.unpack("<5h", data)
-    scale = float(1 << 14)
-    return [q0 / scale, q1 / scale, q2 / scale, q3 / scale]
+# tuple-returning decoder, formerly defined here
+parse_packet = unpack_packet
 
 
 async def get_nx_tracker() -> str:
-    scanner = BleakScanner()
-    devices = await scanner.discover()
-    # get matching devices
-    nxs = [dev for dev in devices if dev.name == DEVICE_NAME]
-    if len(nxs) == 0:
+    device = await find_nx_tracker()
+    if device is None:
         raise RuntimeError("No Nx Tracker 2 devices were found!")
-    if n := len(nxs) > 1:
-        print(f"WARNING: Multiple Nx Tracker 2 devices were found! ({n=})")
 
-    return nxs[0].address
+    return device.address
 
 
 class BleakRunner(threading.Thread):
@@ -47,9 +49,53 @@ class BleakRunner(threading.Thread):
         self._batt_update = update_batt
         self._running = False
         self.client: BleakClient
-
-        # set up your OSC client once, reuse on every packet
-        self.osc_client = udp_client.SimpleUDPClient(OSC_IP, OSC_PORT)
+        # keeps the preferred connection parameters alive while connected
+        self._conn_params = None
+
+        # set up your OSC socket once, reuse on every packet. messages are serialized
+        # by hand, so pythonosc isn't needed on this path
+        self._osc_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._osc_addr = (OSC_IP, OSC_PORT)
+
+        # OSC is sent from its own thread so BLE callbacks return immediately.
+        # only the latest quaternion is kept; stale ones are dropped, not queued
+        self._latest = None
+        self._osc_buf = bytearray(_OSC_HEADER + bytes(_OSC_ARGS.size))
+        self._sender_evt = threading.Event()
+        self._sender_running = True
+        self._sender = threading.Thread(target=self._sender_loop, daemon=True)
+        self._sender.start()
+
+    def _sender_loop(self):
+        # `_latest` is never reset from this thread, so a packet stored while we are
+        # reading it can't be lost. the last sent one is recognized by identity instead
+        sent = None
+        while True:
+            self._sender_evt.wait()
+            self._sender_evt.clear()
+            if not self._sender_running:
+                return
+            quat = self._latest
+            if quat is not None and quat is not sent:
+                # same bytes as pythonosc's `send_message("/quat", quat)`
+                _OSC_ARGS.pack_into(self._osc_buf, len(_OSC_HEADER), *quat)
+                self._osc_sock.sendto(self._osc_buf, self._osc_addr)
+                sent = quat
+
+    def _on_notify(self, _handle, data):
+        quat = unpack_packet(data)
+
+        # 1) update the Tk label
+        self._update(quat)
+
+        # 2) hand off to the sender thread, which broadcasts it to /quat
+        #    payload is four floats
+        self._latest = quat
+        self._sender_evt.set()
+
+    def _batt_notify(self, _handle, data):
+        batt = int.from_bytes(data)
+        self._batt_update(batt)
 
     def reset(self):
         async def _reset():
@@ -74,26 +120,13 @@ class BleakRunner(threading.Thread):
             self.client = BleakClient(self.address, loop=self.loop)
 
             await self.client.connect()
+            self._conn_params = request_low_latency(self.client)
             # tell device “start streaming”
             await self.client.write_gatt_char(START_UUID, b"\xff")
 
-            # register BLE notification handler
-            def _on_notify(_handle, data):
-                quat = parse_packet(data)
-
-                # 1) update the Tk label
-                self._update(quat)
-
-                # 2) broadcast OSC message to /quat
-                #    payload is four floats
-                self.osc_client.send_message("/quat", quat)
-
-            def _batt_notify(_handle, data):
-                batt = int.from_bytes(data)
-                self._batt_update(batt)
-
-            await self.client.start_notify(STREAM_UUID, _on_notify)
-            await self.client.start_notify(BATTERY_UUID, _batt_notify)
+            # register BLE notification handlers
+            await self.client.start_notify(STREAM_UUID, self._on_notify)
+            await self.client.start_notify(BATTERY_UUID, self._batt_notify)
 
             # battery level notification rate is very low, so we get the initial value
             # manually, without waiting for next update. otherwise it stays empty for a few
@@ -113,6 +146,9 @@ class BleakRunner(threading.Thread):
             # tell device “stop streaming”
             await self.client.write_gatt_char(START_UUID, b"\x00")
             await self.client.stop_notify(STREAM_UUID)
+            if self._conn_params is not None:
+                self._conn_params.close()
+                self._conn_params = None
             await self.client.disconnect()
 
         asyncio.run_coroutine_threadsafe(_stop(), self.loop)
@@ -121,14 +157,22 @@ class BleakRunner(threading.Thread):
         self.stop_stream()
         self.loop.call_soon_threadsafe(self.loop.stop)
 
+        self._sender_running = False
+        self._sender_evt.set()
+        self._sender.join()
+        self._osc_sock.close()
+
 
 class Window(tk.Tk):
+    _FMT = "quat=[{:.2f}, {:.2f}, {:.2f}, {:.2f}]"
+
     def __init__(self, address):
         super().__init__()
         self.title("BLE→OSC Quaternion")
         self.protocol("WM_DELETE_WINDOW", self.on_close)
 
-        self.lbl = tk.Label(self, text="quat=[----, ----, ----, ----]")
+        self.quat_var = tk.StringVar(self, value="quat=[----, ----, ----, ----]")
+        self.lbl = tk.Label(self, textvariable=self.quat_var)
         self.lbl.pack(padx=20, pady=10)
 
         self.lbl2 = tk.Label(self, text="----")
@@ -140,6 +184,12 @@ class Window(tk.Tk):
         self.btn2 = tk.Button(self, text="Reset", command=self.reset)
         self.btn2.pack(padx=20, pady=5)
 
+        # latest quaternion from the BLE thread. the label polls it at ~30 Hz
+        # instead of scheduling a Tk callback for every packet
+        self._pending_quat = None
+        self._shown_quat = None
+        self.after(33, self._refresh_label)
+
         self.ble = BleakRunner(address, self.update_quat, self.update_batt)
         self.ble.start()
 
@@ -162,10 +212,17 @@ class Window(tk.Tk):
         self.after(0, lambda: self.lbl2.config(text=f"{batt}%"))
 
     def update_quat(self, quat):
-        # BLE thread → Tk thread
-        text = "quat=[" + ", ".join(f"{x:.2f}" for x in quat) + "]"
-        # this way of updating label text is necessary, persumably due to some async/thread shenanigans
-        self.after(0, lambda: self.lbl.config(text=text))
+        # BLE thread → Tk thread, picked up by `_refresh_label`
+        self._pending_quat = quat
+
+    def _refresh_label(self):
+        # `_pending_quat` is only ever written by the BLE thread, so no update is lost.
+        # skip the redraw if it is still the one already shown
+        quat = self._pending_quat
+        if quat is not None and quat is not self._shown_quat:
+            self._shown_quat = quat
+            self.quat_var.set(self._FMT.format(*quat))
+        self.after(33, self._refresh_label)
 
     def on_close(self):
         self.ble.shutdown()